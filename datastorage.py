@@ -56,12 +56,13 @@ class Datastore(object):
     return fn
 
   def _add_history_record(self, ticker, *args):
-    record = (now_tuple(),) + args
+    self._add_history_records({ticker: [(now_tuple(),) + args]})
+
+  def _add_history_records(self, records):
+    """Add many history records (dict of ticker -> list of records) in one write."""
     with shelve.open(self._history_file) as history:
-      if ticker not in history:
-        history[ticker] = [record]
-      else:
-        history[ticker] += [record]
+      for ticker, recs in records.items():
+        history[ticker] = history.get(ticker, []) + recs
 
   def _remove_from_picklist_in_future(self, ticker, hours):
     """Use the system 'at' command to run 'unpick' at a future time."""
@@ -97,7 +98,9 @@ class Datastore(object):
     bought = sum(t[2] for t in buy_trans)
     sold = sum(t[2] for t in sell_trans)
     holding = bought - sold
-    avg = sum(t[3] for t in buy_trans)/len(buy_trans)
+    avg = 0.0
+    if buy_trans:
+      avg = sum(t[3] for t in buy_trans)/len(buy_trans)
     return {'holding': holding,
             'average_cost': avg,
             'bought': bought,
@@ -118,6 +121,44 @@ class Datastore(object):
   def add_sell(self, ticker, shares, price):
     self._add_position('sell', ticker, shares, price)
 
+  def add_transactions(self, transactions):
+    """Add many buys/sells in a single pass over the datastore.
+
+    Each transaction is a dict with 'ticker', 'sale_type' ('buy' or 'sell'),
+    'shares' and 'price', and optionally a 'timestamp' time-tuple (defaults to
+    now), 'attrs' to update the position with (e.g. stoploss) and a 'key'.
+    Transactions whose key was stored by an earlier call are skipped. Keys are
+    never matched against other transactions of the same call.
+
+    Returns the transactions that were added.
+    """
+    added = []
+    records = {}
+    with shelve.open(self._positions_file) as positions:
+      updated = {}
+      previously_imported = {}
+      for trans in transactions:
+        ticker = trans['ticker']
+        if ticker not in updated:
+          updated[ticker] = positions.get(ticker, {'transactions': []})
+          previously_imported[ticker] = set(updated[ticker].get('imported', ()))
+        pos = updated[ticker]
+        key = trans.get('key')
+        if key is not None:
+          if key in previously_imported[ticker]:
+            continue
+          pos.setdefault('imported', set()).add(key)
+        record = (trans.get('timestamp') or now_tuple(),
+                  trans['sale_type'], trans['shares'], trans['price'])
+        pos['transactions'].append(record)
+        pos.update(trans.get('attrs') or {})
+        records.setdefault(ticker, []).append(record)
+        added.append(trans)
+      for ticker in records:
+        positions[ticker] = updated[ticker]
+    self._add_history_records(records)
+    return added
+
   def get_position_summary(self, ticker):
     with shelve.open(self._positions_file) as positions:
       return self._calc_position_summary(ticker, positions[ticker])
@@ -131,6 +172,11 @@ class Datastore(object):
                                   'takeprofit': pos.get('takeprofit')})
     return summaries
 
+  def get_imported_keys(self):
+    """Get the keys of the transactions imported so far, as ticker -> set of keys."""
+    with shelve.open(self._positions_file) as positions:
+      return {ticker: set(pos.get('imported', ())) for ticker, pos in positions.items()}
+
   def add_to_watchlist(self, ticker, note):
     with shelve.open(self._watchlist_file) as watchlist:
       if ticker in watchlist:
@@ -169,6 +215,17 @@ class Datastore(object):
 
 def now_tuple():
   """Get the current datetime as a time-tuple."""
-  return tuple(datetime.datetime.now().utctimetuple())
+  return datetime_tuple(datetime.datetime.now())
+
+
+def datetime_tuple(dt):
+  """Get a datetime as a time-tuple, the way the datastore keeps timestamps.
+
+  Timestamps are local wall-clock times, so aware datetimes are converted to
+  local time first; naive ones are taken as local already.
+  """
+  if dt.tzinfo is not None:
+    dt = dt.astimezone().replace(tzinfo=None)
+  return tuple(dt.utctimetuple())
 
 
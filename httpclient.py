@@ -0,0 +1,265 @@
+"""A shared HTTP client for the scraper modules.
+
+Every remote page or API we scrape goes through one pooled requests.Session so
+connections are kept alive between calls. Each host is limited to a handful of
+concurrent requests and every request gets a timeout. GET responses are cached
+on disk: a cached response is served as-is until its TTL runs out, then it is
+revalidated with the server (If-None-Match/If-Modified-Since) before falling
+back to a full download.
+"""
+
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+CACHE_DIR = '/tmp/_stock_http_cache_'
+
+# Connection pool and concurrency settings
+POOL_CONNECTIONS = 10  # number of hosts to keep pools for
+POOL_MAXSIZE = 10      # connections kept alive per host
+MAX_PER_HOST = 4       # concurrent requests allowed per host
+TIMEOUT = (5, 30)      # (connect, read) in seconds
+
+# Some sites refuse to serve the default python-requests User-Agent
+USER_AGENT = 'Mozilla/5.0 (Windows NT 6.1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/41.0.2228.0 Safari/537.36'
+
+# Regexes
+MAX_AGE_RE = re.compile(r'max-age\s*=\s*(\d+)')
+
+
+class Error(Exception):
+  """Base error class."""
+
+
+class HTTPError(Error):
+  """The server answered with an unexpected status code."""
+
+
+class CachedResponse(object):
+  """A response as kept in the on-disk cache.
+
+  Has the same basic interface as requests.Response (status_code, headers,
+  content, text, json()) so callers don't care whether it came from the network
+  or from disk.
+  """
+
+  def __init__(self, url, status_code, headers, content, encoding, fetched, ttl):
+    self.url = url
+    self.status_code = status_code
+    self.headers = headers
+    self.content = content
+    self.encoding = encoding
+    self.fetched = fetched  # time.time() of last (re)validation
+    self.ttl = ttl
+    self.from_cache = False
+
+  @classmethod
+  def FromResponse(cls, resp, ttl):
+    return cls(url=resp.url,
+               status_code=resp.status_code,
+               headers=CaseInsensitiveDict(resp.headers),
+               content=resp.content,
+               encoding=resp.encoding,
+               fetched=time.time(),
+               ttl=ttl)
+
+  @property
+  def text(self):
+    return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+  def json(self):
+    return json.loads(self.text)
+
+  def IsFresh(self):
+    return (time.time() - self.fetched) < self.ttl
+
+  def Validators(self):
+    """Headers for a conditional request to revalidate this response."""
+    headers = {}
+    if 'ETag' in self.headers:
+      headers['If-None-Match'] = self.headers['ETag']
+    if 'Last-Modified' in self.headers:
+      headers['If-Modified-Since'] = self.headers['Last-Modified']
+    return headers
+
+
+class ResponseCache(object):
+  """Stores CachedResponse objects as pickle files in a directory."""
+
+  def __init__(self, directory=CACHE_DIR):
+    self.directory = directory
+    if not os.path.exists(self.directory):
+      os.makedirs(self.directory)
+
+  def _Path(self, key):
+    return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+  def Load(self, key):
+    try:
+      with open(self._Path(key), 'rb') as f:
+        return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+      return None
+
+  def Save(self, key, entry):
+    # Write to a temp file first so readers never see a half-written entry
+    path = self._Path(key)
+    tmp_path = '{}.{}.tmp'.format(path, threading.get_ident())
+    with open(tmp_path, 'wb') as f:
+      pickle.dump(entry, f)
+    os.replace(tmp_path, path)
+
+  def Remove(self, key):
+    try:
+      os.remove(self._Path(key))
+    except FileNotFoundError:
+      pass
+
+
+def _TTLFromHeaders(headers):
+  """Get the TTL the server asks for, in seconds. None if it asks us not to store it."""
+  cache_control = headers.get('Cache-Control', '').lower()
+  if 'no-store' in cache_control:
+    return None
+  if 'no-cache' in cache_control:
+    return 0
+  match = MAX_AGE_RE.search(cache_control)
+  if match:
+    return int(match.group(1))
+  return 0
+
+
+def _ChooseTTL(ttl, headers):
+  """TTL to store a response with: ours if given, else the server's.
+
+  None (don't store) whenever the server says no-store, even if we gave a TTL.
+  """
+  server_ttl = _TTLFromHeaders(headers)
+  if server_ttl is None or ttl is None:
+    return server_ttl
+  return ttl
+
+
+def _CacheKey(url, params):
+  if params:
+    url = '{}?{}'.format(url, urllib.parse.urlencode(sorted(params.items())))
+  return url
+
+
+class HTTPClient(object):
+  """Pooled, rate-limited and caching HTTP client.
+
+  Use GetClient() to get the shared instance instead of making new ones, or else
+  there is no connection reuse.
+  """
+
+  def __init__(self, cache=None, timeout=TIMEOUT, max_per_host=MAX_PER_HOST):
+    self.cache = cache or ResponseCache()
+    self.timeout = timeout
+    self.max_per_host = max_per_host
+    self.session = requests.Session()
+    self.session.headers['User-Agent'] = USER_AGENT
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS,
+                          pool_maxsize=POOL_MAXSIZE,
+                          pool_block=True)
+    self.session.mount('http://', adapter)
+    self.session.mount('https://', adapter)
+    self._host_semaphores = {}
+    self._lock = threading.Lock()
+
+  def _HostSemaphore(self, url):
+    host = urllib.parse.urlsplit(url).netloc
+    with self._lock:
+      if host not in self._host_semaphores:
+        self._host_semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+      return self._host_semaphores[host]
+
+  def Request(self, method, url, **kwargs):
+    """Make a request through the pool without touching the cache."""
+    kwargs.setdefault('timeout', self.timeout)
+    with self._HostSemaphore(url):
+      return self.session.request(method, url, **kwargs)
+
+  def Get(self, url, params=None, headers=None, cookies=None, ttl=None, live=False):
+    """GET a URL, going through the on-disk cache.
+
+    Args:
+      ttl: seconds a response stays fresh. None means use the server's
+           Cache-Control header. A server's no-store is always honored.
+      live: skip a fresh cache entry and revalidate with the server anyway.
+
+    Returns:
+      A CachedResponse.
+
+    Raises:
+      HTTPError if the server answers with an error status, or with a 304
+      for something we don't have cached.
+    """
+    key = _CacheKey(url, params)
+    entry = self.cache.Load(key)
+    if entry is not None and entry.IsFresh() and not live:
+      entry.from_cache = True
+      return entry
+
+    # Stale (or forced): ask the server whether what we have is still good
+    req_headers = dict(headers or {})
+    if entry is not None:
+      req_headers.update(entry.Validators())
+    resp = self.Request('GET', url, params=params, headers=req_headers, cookies=cookies)
+
+    if resp.status_code == 304:
+      if entry is None:
+        raise HTTPError('GET {} returned 304 but nothing is cached'.format(url))
+      entry.headers.update(resp.headers)
+      entry.fetched = time.time()
+      entry.from_cache = True
+      self._Store(key, entry, _ChooseTTL(ttl, entry.headers))
+      return entry
+
+    if resp.status_code >= 400:
+      raise HTTPError('GET {} returned {}'.format(url, resp.status_code))
+
+    entry = CachedResponse.FromResponse(resp, 0)
+    self._Store(key, entry, _ChooseTTL(ttl, resp.headers))
+    return entry
+
+  def _Store(self, key, entry, ttl):
+    """Save entry with the given TTL, or drop it from the cache if ttl is None."""
+    if ttl is None:
+      entry.ttl = 0
+      self.cache.Remove(key)
+    else:
+      entry.ttl = ttl
+      self.cache.Save(key, entry)
+
+  def Forget(self, url, params=None):
+    """Drop the cached response of a URL, e.g. when it turned out to be an error page."""
+    self.cache.Remove(_CacheKey(url, params))
+
+  def Post(self, url, **kwargs):
+    """POST to a URL. Never cached."""
+    return self.Request('POST', url, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def GetClient():
+  """Get the shared HTTPClient, creating it on first use."""
+  global _client
+  with _client_lock:
+    if _client is None:
+      _client = HTTPClient()
+    return _client
@@ -0,0 +1,193 @@
+"""Tests for httpclient, run against a local stub HTTP server."""
+
+
+import http.server
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import httpclient
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+  """Serves a fixed body per path, with the validators and Cache-Control of the path."""
+
+  # path -> (status, Cache-Control header or None, Cache-Control of a 304 or None)
+  ROUTES = {
+      '/etag': (200, None, None),
+      '/no-store': (200, 'no-store', None),
+      '/no-cache': (200, 'no-cache', None),
+      '/max-age': (200, 'max-age=3600', None),
+      '/max-age-on-304': (200, 'no-cache', 'max-age=3600'),
+      '/last-modified': (200, None, None),
+      '/always-304': (304, None, None),
+      '/slow': (200, 'no-store', None),
+      '/missing': (404, None, None),
+  }
+  ETAG = '"v1"'
+  LAST_MODIFIED = 'Wed, 21 Oct 2015 07:28:00 GMT'
+  BODY = b'{"hello": "world"}'
+  SLOW_SECONDS = 0.2
+
+  def do_GET(self):
+    path = self.path.split('?')[0]
+    validator = self.headers.get('If-None-Match') or self.headers.get('If-Modified-Since')
+    self.server.requests.append((self.path, validator))
+    status, cache_control, cache_control_304 = self.ROUTES[path]
+    if path == '/slow':
+      self._Slow()
+    if path == '/last-modified':
+      validators = {'Last-Modified': self.LAST_MODIFIED}
+      not_modified = self.headers.get('If-Modified-Since') == self.LAST_MODIFIED
+    else:
+      validators = {'ETag': self.ETAG}
+      not_modified = self.headers.get('If-None-Match') == self.ETAG
+    if status == 304 or (status == 200 and not_modified):
+      self.send_response(304)
+      for name, value in validators.items():
+        self.send_header(name, value)
+      if cache_control_304:
+        self.send_header('Cache-Control', cache_control_304)
+      self.end_headers()
+      return
+    self.send_response(status)
+    for name, value in validators.items():
+      self.send_header(name, value)
+    if cache_control:
+      self.send_header('Cache-Control', cache_control)
+    self.send_header('Content-Length', str(len(self.BODY)))
+    self.end_headers()
+    self.wfile.write(self.BODY)
+
+  def _Slow(self):
+    """Hold the request for a while, keeping track of how many are in flight."""
+    with self.server.lock:
+      self.server.in_flight += 1
+      self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+    time.sleep(self.SLOW_SECONDS)
+    with self.server.lock:
+      self.server.in_flight -= 1
+
+  def log_message(self, *args):
+    pass
+
+
+class HTTPClientTest(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    cls.server.requests = []
+    cls.server.lock = threading.Lock()
+    cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+    cls.thread.start()
+    cls.base_url = 'http://127.0.0.1:{}'.format(cls.server.server_port)
+
+  @classmethod
+  def tearDownClass(cls):
+    cls.server.shutdown()
+    cls.server.server_close()
+
+  def setUp(self):
+    self.cache_dir = tempfile.mkdtemp()
+    self.client = httpclient.HTTPClient(cache=httpclient.ResponseCache(self.cache_dir))
+    self.server.requests.clear()
+    self.server.in_flight = self.server.max_in_flight = 0
+
+  def tearDown(self):
+    shutil.rmtree(self.cache_dir)
+
+  def testFreshHitIsServedFromCache(self):
+    first = self.client.Get(self.base_url + '/etag', params={'q': 1}, ttl=60)
+    second = self.client.Get(self.base_url + '/etag', params={'q': 1}, ttl=60)
+    self.assertEqual({'hello': 'world'}, first.json())
+    self.assertFalse(first.from_cache)
+    self.assertTrue(second.from_cache)
+    self.assertEqual({'hello': 'world'}, second.json())
+    self.assertEqual(1, len(self.server.requests))
+
+  def testStaleEntryIsRevalidatedWithETag(self):
+    self.client.Get(self.base_url + '/etag', ttl=0)
+    resp = self.client.Get(self.base_url + '/etag', ttl=0)
+    self.assertTrue(resp.from_cache)
+    self.assertEqual(b'{"hello": "world"}', resp.content)
+    self.assertEqual([('/etag', None), ('/etag', '"v1"')], self.server.requests)
+
+  def testLiveRevalidatesFreshEntry(self):
+    self.client.Get(self.base_url + '/etag', ttl=60)
+    resp = self.client.Get(self.base_url + '/etag', ttl=60, live=True)
+    self.assertTrue(resp.from_cache)
+    self.assertEqual([('/etag', None), ('/etag', '"v1"')], self.server.requests)
+
+  def testServerMaxAgeIsUsedWithoutTTL(self):
+    self.client.Get(self.base_url + '/max-age')
+    resp = self.client.Get(self.base_url + '/max-age')
+    self.assertTrue(resp.from_cache)
+    self.assertEqual(1, len(self.server.requests))
+
+  def testNoStoreIsNeverCached(self):
+    self.client.Get(self.base_url + '/no-store')
+    resp = self.client.Get(self.base_url + '/no-store')
+    self.assertFalse(resp.from_cache)
+    self.assertEqual([('/no-store', None), ('/no-store', None)], self.server.requests)
+
+  def testNoCacheIsAlwaysRevalidated(self):
+    self.client.Get(self.base_url + '/no-cache')
+    resp = self.client.Get(self.base_url + '/no-cache')
+    self.assertTrue(resp.from_cache)
+    self.assertEqual([('/no-cache', None), ('/no-cache', '"v1"')], self.server.requests)
+
+  def testForgetDropsCachedEntry(self):
+    self.client.Get(self.base_url + '/etag', ttl=60)
+    self.client.Forget(self.base_url + '/etag')
+    resp = self.client.Get(self.base_url + '/etag', ttl=60)
+    self.assertFalse(resp.from_cache)
+    self.assertEqual([('/etag', None), ('/etag', None)], self.server.requests)
+
+  def testStaleEntryIsRevalidatedWithLastModified(self):
+    self.client.Get(self.base_url + '/last-modified', ttl=0)
+    resp = self.client.Get(self.base_url + '/last-modified', ttl=0)
+    self.assertTrue(resp.from_cache)
+    self.assertEqual(b'{"hello": "world"}', resp.content)
+    self.assertEqual([('/last-modified', None), ('/last-modified', StubHandler.LAST_MODIFIED)],
+                     self.server.requests)
+
+  def testNoStoreWinsOverExplicitTTL(self):
+    self.client.Get(self.base_url + '/no-store', ttl=60)
+    resp = self.client.Get(self.base_url + '/no-store', ttl=60)
+    self.assertFalse(resp.from_cache)
+    self.assertEqual([('/no-store', None), ('/no-store', None)], self.server.requests)
+
+  def testNotModifiedUpdatesServerTTL(self):
+    self.client.Get(self.base_url + '/max-age-on-304')
+    self.client.Get(self.base_url + '/max-age-on-304')  # 304 now says max-age=3600
+    resp = self.client.Get(self.base_url + '/max-age-on-304')
+    self.assertTrue(resp.from_cache)
+    self.assertEqual(3600, resp.ttl)
+    self.assertEqual(2, len(self.server.requests))
+
+  def testNotModifiedWithoutCacheEntryRaises(self):
+    with self.assertRaises(httpclient.HTTPError):
+      self.client.Get(self.base_url + '/always-304')
+    self.assertIsNone(self.client.cache.Load(httpclient._CacheKey(self.base_url + '/always-304', None)))
+
+  def testConcurrentRequestsAreLimitedPerHost(self):
+    client = httpclient.HTTPClient(cache=httpclient.ResponseCache(self.cache_dir), max_per_host=2)
+    threads = [threading.Thread(target=client.Get, args=(self.base_url + '/slow',), kwargs={'params': {'n': n}})
+               for n in range(6)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(6, len(self.server.requests))
+    self.assertEqual(2, self.server.max_in_flight)
+
+  def testErrorStatusRaises(self):
+    with self.assertRaises(httpclient.HTTPError):
+      self.client.Get(self.base_url + '/missing')
+
+
+if __name__ == '__main__':
+  unittest.main()
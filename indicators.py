@@ -0,0 +1,113 @@
+"""Vectorized indicators and Five Energies signals over a Panel.
+
+These mirror the per-ticker functions of the Energies script, but take the
+dates x tickers DataFrames of a panel.Panel and compute every ticker on every
+date in one pass. Each row only uses data up to and including its own date, so
+row N is exactly what the indicator read at the close of day N.
+"""
+
+
+import numpy as np
+import pandas as pd
+
+
+ENERGIES = ('trend', 'momentum', 'cycle', 'support', 'scale')
+
+
+def SMA(prices, period):
+  return prices.rolling(window=period).mean()
+
+
+def EMA(prices, period):
+  return prices.ewm(span=period).mean()
+
+
+def MACD(close, fast_length, slow_length, smoothing):
+  macd = EMA(close, fast_length) - EMA(close, slow_length)
+  signal = macd.ewm(span=smoothing).mean()
+  histogram = macd - signal
+  return macd, signal, histogram
+
+
+def Stoch(high, low, close, period_k, period_d, smoothing):
+  lowest_low = low.rolling(period_k).min()
+  highest_high = high.rolling(period_k).max()
+  fast_k = 100 * (close - lowest_low) / (highest_high - lowest_low)
+  slow_k = fast_k.rolling(smoothing).mean()
+  slow_d = slow_k.rolling(period_d).mean()
+  return slow_k, slow_d
+
+
+def Direction(prices, smoothing):
+  """Sign of the smoothed change: 1 (up), -1 (down), 0 (flat) or NaN (not enough data)."""
+  return np.sign(prices.diff().rolling(window=smoothing).mean())
+
+
+def _IsUp(direction):
+  # Like Energies.NameDirection, flat counts as up. NaN is never up.
+  return direction >= 0
+
+
+def _ByPeriod(prices, freq):
+  """Group daily prices into calendar periods ('W', 'M', ...)."""
+  return prices.groupby(prices.index.to_period(freq))
+
+
+def _SpreadCompletedPeriods(period_values, daily_index, freq):
+  """Give each day the value of the last *completed* period before it."""
+  previous = period_values.shift(1).reindex(daily_index.to_period(freq))
+  return pd.DataFrame(previous.values, index=daily_index, columns=period_values.columns)
+
+
+def EnergyOfTrend(panel):
+  """Trend is up when the 50-day SMA is rising."""
+  return _IsUp(Direction(SMA(panel.close, 50), 1))
+
+
+def EnergyOfMomentum(panel):
+  """Momentum is favorable when the daily MACD is rising."""
+  macd, _, _ = MACD(panel.close, 12, 26, 9)
+  return _IsUp(Direction(macd, 2))
+
+
+def EnergyOfCycle(panel):
+  """Cycle is favorable when the stochastic is rising or already low."""
+  k, _ = Stoch(panel.high, panel.low, panel.close, 5, 3, 2)
+  return _IsUp(Direction(k, 2)) | (k <= 20)
+
+
+def MonthlyPivotPoint(panel):
+  """The pivot point from last month's high, low and close, for each day."""
+  high = _ByPeriod(panel.high, 'M').max()
+  low = _ByPeriod(panel.low, 'M').min()
+  close = _ByPeriod(panel.close, 'M').last()
+  return _SpreadCompletedPeriods((high + low + close) / 3, panel.dates, 'M')
+
+
+def EnergyOfSupport(panel):
+  """Support/resistance is favorable when price is above the monthly pivot point."""
+  return panel.close > MonthlyPivotPoint(panel)
+
+
+def EnergyOfScale(panel):
+  """Scale is favorable when the weekly MACD is rising.
+
+  Only completed weeks are used, so a day never sees the close of its own week.
+  """
+  weekly_close = _ByPeriod(panel.close, 'W').last()
+  macd, _, _ = MACD(weekly_close, 12, 26, 9)
+  return _IsUp(_SpreadCompletedPeriods(Direction(macd, 2), panel.dates, 'W'))
+
+
+def FiveEnergies(panel):
+  """Get a dict of energy name -> boolean dates x tickers DataFrame (True if favorable)."""
+  return {'trend': EnergyOfTrend(panel),
+          'momentum': EnergyOfMomentum(panel),
+          'cycle': EnergyOfCycle(panel),
+          'support': EnergyOfSupport(panel),
+          'scale': EnergyOfScale(panel)}
+
+
+def CountEnergies(energies):
+  """Number of favorable energies for each ticker on each date."""
+  return sum(energies[name].astype(int) for name in ENERGIES)
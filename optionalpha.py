@@ -16,6 +16,8 @@ import requests
 import time
 import yaml
 
+import httpclient
+
 
 LOGIN_URL = 'https://legacy.optionalpha.com/wp-login.php'
 WATCHLIST_URL = 'https://legacy.optionalpha.com/members/watch-list'
@@ -171,7 +173,10 @@ class WatchListFetcher(object):
     self.session = session
 
   def FetchWatchListPage(self):
-    page = self.session.get(WATCHLIST_URL)
+    # Only the login cookies come from our session, the request itself goes
+    # through the shared client's pool. It is a members-only page, so it is kept
+    # out of the shared on-disk cache; GetWatchList caches the parsed result.
+    page = httpclient.GetClient().Request('GET', WATCHLIST_URL, cookies=self.session.cookies)
     return page.text
 
 
@@ -212,7 +217,7 @@ def GetOptionAlphaSession(force_login):
   session = requests.Session()
   login = input('   Login: ')
   password = getpass.getpass('Password: ')
-  session.post(LOGIN_URL, data={'log': login, 'pwd': password})
+  session.post(LOGIN_URL, data={'log': login, 'pwd': password}, timeout=httpclient.TIMEOUT)
   with open(COOKIEJAR_PATH, 'wb') as f:
     pickle.dump(session, f)
   return session
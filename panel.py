@@ -0,0 +1,84 @@
+"""Daily price history for many tickers at once.
+
+A Panel holds one DataFrame per price field (open, high, low, close, volume)
+where the rows are dates and the columns are tickers. This lets indicators be
+computed for a whole universe of tickers in one vectorized pass instead of one
+ticker at a time.
+"""
+
+
+from concurrent import futures
+
+import pandas as pd
+
+import fetcher
+
+
+# Panel attribute -> data-source column
+FIELDS = (('open', fetcher.DataSource.OPEN),
+          ('high', fetcher.DataSource.HIGH),
+          ('low', fetcher.DataSource.LOW),
+          ('close', fetcher.DataSource.CLOSE),
+          ('volume', fetcher.DataSource.VOLUME))
+
+# Number of tickers fetched at the same time
+FETCH_WORKERS = 8
+
+
+class Panel(object):
+  """Dates x tickers DataFrames of daily OHLCV data.
+
+  Optionally also holds the close of a benchmark (e.g. SPY) as a Series over
+  the same dates, to measure relative strength against.
+  """
+
+  def __init__(self, open, high, low, close, volume, benchmark=None):
+    self.open = open
+    self.high = high
+    self.low = low
+    self.close = close
+    self.volume = volume
+    self.benchmark = benchmark
+
+  @classmethod
+  def FromFrames(cls, frames, benchmark=None):
+    """Build a panel from a dict of ticker -> OHLCV DataFrame (as from DataFetcher)."""
+    tickers = sorted(frames)
+    fields = {}
+    for attr, column in FIELDS:
+      field = pd.concat([frames[t][column] for t in tickers], axis=1, keys=tickers)
+      field.index = pd.to_datetime(field.index)
+      fields[attr] = field.sort_index()
+    if benchmark is not None:
+      benchmark = pd.Series(benchmark[fetcher.DataSource.CLOSE].values,
+                            index=pd.to_datetime(benchmark.index))
+      benchmark = benchmark.sort_index().reindex(fields['close'].index)
+    return cls(benchmark=benchmark, **fields)
+
+  @classmethod
+  def Load(cls, tickers, benchmark=None):
+    """Load the (cached) daily history of each ticker into a panel."""
+    data_fetcher = fetcher.DataFetcher()
+    tickers = sorted(set(tickers))
+    with futures.ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+      frames = dict(zip(tickers, executor.map(data_fetcher.FetchData, tickers)))
+    if benchmark is not None:
+      benchmark = data_fetcher.FetchData(benchmark)
+    return cls.FromFrames(frames, benchmark=benchmark)
+
+  @property
+  def tickers(self):
+    return list(self.close.columns)
+
+  @property
+  def dates(self):
+    return self.close.index
+
+  def Window(self, days, end=None):
+    """A new panel with only the last `days` dates up to (and including) `end`."""
+    def cut(frame):
+      if frame is None:
+        return None
+      return frame.loc[:end].tail(days)
+    fields = {attr: cut(getattr(self, attr)) for attr, _ in FIELDS}
+    return Panel(benchmark=cut(self.benchmark), **fields)
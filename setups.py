@@ -0,0 +1,237 @@
+"""Vectorized criteria of "The Perfect Setup" over a Panel.
+
+Each criterion takes a panel.Panel and returns a (value, good) pair of dates x
+tickers DataFrames: the computed value and whether it meets the criterion. The
+thresholds come from "The 5 Secrets To Highly Profitable Swing Trading" by
+Ivaylo Ivanov (see the PerfectSetup script).
+"""
+
+
+import collections
+import functools
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+
+# higher_is_better tells which way to sort the values, best first
+Criterion = collections.namedtuple('Criterion', 'header compute fmt higher_is_better',
+                                   defaults=(True,))
+
+# Dates needed to compute every criterion on the last one (half year + averages)
+LOOKBACK = 200
+
+# Periods in days to measure relative strength and "good potential" over, with
+# the gain that counts as good potential (the book's small/mid cap numbers)
+RS_PERIODS = ((5, 0.10),    # week
+              (21, 0.20),   # month
+              (63, 0.30),   # quarter
+              (126, 0.40))  # half year
+
+
+def _Fold(ufunc, frames):
+  """Element-wise max/min (np.fmax/np.fmin) of DataFrames, ignoring NaN."""
+  return functools.reduce(ufunc, frames)
+
+
+def _PercentFrom(prices, reference):
+  return prices / reference - 1
+
+
+##### The Perfect Setup
+
+
+def PreviousUptrend(panel, days=63, min_gain=0.30):
+  """Previous uptrend.
+
+  The book gives no number for it, so an uptrend is a gain of at least the
+  quarterly "good potential" (30%) off the lowest close of the last quarter.
+  """
+  gain = _PercentFrom(panel.close, panel.close.rolling(days).min())
+  return gain, gain >= min_gain
+
+
+def NearTenDayHigh(panel, within=0.03):
+  """Near 10-day high (within 3% of it)."""
+  highest = panel.high.rolling(10).max()
+  percent = _PercentFrom(panel.high, highest)
+  return percent, percent.abs() <= within
+
+
+def HighRelativeStrength(panel):
+  """High relative strength on weekly, monthly, quarterly or half year basis.
+
+  The value is the most the ticker beat the benchmark by over any of the periods.
+  Without a benchmark, the median ticker of the panel is used instead.
+  """
+  excesses = []
+  for days, _ in RS_PERIODS:
+    gain = _PercentFrom(panel.close, panel.close.shift(days))
+    if panel.benchmark is not None:
+      benchmark_gain = _PercentFrom(panel.benchmark, panel.benchmark.shift(days))
+    else:
+      benchmark_gain = gain.median(axis=1)
+    excesses.append(gain.sub(benchmark_gain, axis=0))
+  best = _Fold(np.fmax, excesses)
+  return best, best > 0
+
+
+def GoodPotential(panel):
+  """Up >10% over week, >20% over month, >30% over quarter or >40% over 6 months.
+
+  The value is the most the gain beat the threshold of its period by.
+  """
+  margins = []
+  for days, min_gain in RS_PERIODS:
+    gain = _PercentFrom(panel.close, panel.close.shift(days))
+    margins.append(gain - min_gain)
+  best = _Fold(np.fmax, margins)
+  return best, best > 0
+
+
+def TightConsolidation(panel, max_range=0.06, min_days=2, max_days=20):
+  """Tight side-ways consolidation on below average volume, lasting anywhere between 2 and 20 trading days.
+
+  The value is the longest such consolidation (in days) ending on each date.
+  """
+  average_volume = panel.volume.rolling(50).mean()
+  days = pd.DataFrame(0, index=panel.dates, columns=panel.tickers)
+
+  # Grow the window one day further back each time instead of calling rolling()
+  # for every window length, which is much slower on a wide panel.
+  highest, lowest, total_volume = panel.high, panel.low, panel.volume
+  for n in range(2, max_days + 1):
+    highest = np.maximum(highest, panel.high.shift(n - 1))
+    lowest = np.minimum(lowest, panel.low.shift(n - 1))
+    total_volume = total_volume + panel.volume.shift(n - 1)
+    if n < min_days:
+      continue
+    price_range = (highest - lowest) / panel.close
+    quiet = (total_volume / n) < average_volume
+    days = days.mask((price_range <= max_range) & quiet, n)
+  return days, days >= min_days
+
+
+def CloseClosingPrices(panel, days=3, within=0.01):
+  """The closing prices of the past few trading days are very near to each other."""
+  spread = (panel.close.rolling(days).max() - panel.close.rolling(days).min()) / panel.close
+  return spread, spread <= within
+
+
+def CoiledNearSMAs(panel, within=0.02):
+  """Coiled near its 5, 10 or 20-day moving average."""
+  distances = [_PercentFrom(panel.close, indicators.SMA(panel.close, period)).abs()
+               for period in (5, 10, 20)]
+  nearest = _Fold(np.fmin, distances)
+  return nearest, nearest <= within
+
+
+def TradingAbove5SMA(panel):
+  """Trading above its 5-day moving average."""
+  percent = _PercentFrom(panel.close, indicators.SMA(panel.close, 5))
+  return percent, percent > 0
+
+
+def FiveSMAAbove20SMA(panel):
+  """5-day moving average is above its 20-day moving average."""
+  percent = _PercentFrom(indicators.SMA(panel.close, 5), indicators.SMA(panel.close, 20))
+  return percent, percent > 0
+
+
+##### Breakout Setup
+
+
+def RangeContraction(panel):
+  """Low-volume range contraction (2 to 20 days) right before today."""
+  days, _ = TightConsolidation(panel)
+  previous = days.shift(1)
+  return previous, previous >= 2
+
+
+def UpFromOpen(panel, min_gain=0.02):
+  """Up from the open >2%."""
+  gain = _PercentFrom(panel.close, panel.open)
+  return gain, gain > min_gain
+
+
+def DailyChange(panel, min_gain=0.02):
+  """Daily change >2%."""
+  gain = _PercentFrom(panel.close, panel.close.shift(1))
+  return gain, gain > min_gain
+
+
+def NewTenDayHigh(panel):
+  """New 10-day high."""
+  percent, _ = NearTenDayHigh(panel)
+  return percent, percent >= 0
+
+
+def AverageDailyVolume(panel, days=50, min_volume=50000):
+  """Average daily volume >50k."""
+  average = panel.volume.rolling(days).mean()
+  return average, average > min_volume
+
+
+def RelativeVolume(panel, days=50):
+  """Relative volume >1."""
+  relative = panel.volume / panel.volume.rolling(days).mean().shift(1)
+  return relative, relative > 1
+
+
+def PriceAbove2(panel, min_price=2):
+  """Price >2."""
+  return panel.close, panel.close > min_price
+
+
+SETUP_CRITERIA = (
+    Criterion('UPTREND', PreviousUptrend, '{:.0%}'),
+    Criterion('NEAR 10D HIGH', NearTenDayHigh, '{:.1%}'),
+    Criterion('REL STRENGTH', HighRelativeStrength, '{:+.1%}'),
+    Criterion('POTENTIAL', GoodPotential, '{:+.1%}'),
+    Criterion('CONSOLIDATION', TightConsolidation, '{:.0f}d'),
+    Criterion('CLOSES', CloseClosingPrices, '{:.1%}', higher_is_better=False),
+    Criterion('COILED', CoiledNearSMAs, '{:.1%}', higher_is_better=False),
+    Criterion('>5SMA', TradingAbove5SMA, '{:+.1%}'),
+    Criterion('5SMA>20SMA', FiveSMAAbove20SMA, '{:+.1%}'),
+)
+
+BREAKOUT_CRITERIA = (
+    Criterion('CONTRACTION', RangeContraction, '{:.0f}d'),
+    Criterion('FROM OPEN', UpFromOpen, '{:+.1%}'),
+    Criterion('CHANGE', DailyChange, '{:+.1%}'),
+    Criterion('10D HIGH', NewTenDayHigh, '{:.1%}'),
+    Criterion('5SMA>20SMA', FiveSMAAbove20SMA, '{:+.1%}'),
+    Criterion('>5SMA', TradingAbove5SMA, '{:+.1%}'),
+    Criterion('AVG VOLUME', AverageDailyVolume, '{:,.0f}'),
+    Criterion('REL VOLUME', RelativeVolume, '{:.2f}'),
+    Criterion('PRICE', PriceAbove2, '{:.2f}'),
+)
+
+
+def Scan(panel, criteria, date=None):
+  """Evaluate criteria for every ticker of the panel on one date (default: the last).
+
+  Returns a (values, goods) pair of DataFrames indexed by ticker with one column
+  per criterion, named after its function. values also has a 'Score' column: the
+  number of criteria met.
+
+  Raises ValueError if the panel has no dates on or before `date`.
+  """
+  panel = panel.Window(LOOKBACK, end=date)
+  if panel.dates.empty:
+    if date is None:
+      raise ValueError('No price history')
+    raise ValueError('No price history on or before {:%Y-%m-%d}'.format(pd.Timestamp(date)))
+  values, goods = {}, {}
+  for criterion in criteria:
+    value, good = criterion.compute(panel)
+    name = criterion.compute.__name__
+    values[name] = value.iloc[-1]
+    goods[name] = good.iloc[-1].astype(bool)
+  names = [criterion.compute.__name__ for criterion in criteria]
+  values = pd.DataFrame(values, columns=names)
+  goods = pd.DataFrame(goods, columns=names)
+  values.insert(0, 'Score', goods.sum(axis=1))
+  return values, goods